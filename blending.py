@@ -0,0 +1,91 @@
+import numpy as np
+from functools import lru_cache
+
+try:
+    # Optional: compiled and parallelized blending
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+def premultiply(image, alpha):
+    """
+        Multiply the image with an uint8 alpha mask (255 = opaque).
+        The result is an uint16 image that can be passed to composite.
+    """
+    return np.multiply(image, alpha, dtype=np.uint16)
+
+@lru_cache(maxsize=8)
+def _work_buffer(shape, dtype, slot=0):
+    """
+        Get a buffer for intermediate values, that is reused for all
+        calls with the same shape
+    """
+    return np.empty(shape, dtype=dtype)
+
+def composite(premultiplied, background, inverse_alpha, out=None):
+    """
+        Composite a premultiplied foreground over the background using
+        fixed-point integer arithmetic.
+        inverse_alpha is 255 - alpha of the foreground.
+        The result is written to out, which may be the background.
+    """
+    if out is None:
+        out = np.empty(premultiplied.shape, dtype=np.uint8)
+
+    if njit is not None:
+        _composite_numba(premultiplied, background, inverse_alpha, out)
+        return out
+
+    blended = _work_buffer(premultiplied.shape, np.uint16)
+    shifted = _work_buffer(premultiplied.shape, np.uint16, 1)
+    np.multiply(background, inverse_alpha, out=blended, dtype=np.uint16)
+    blended += premultiplied
+    # Rounded division by 255: (x + 128 + ((x + 128) >> 8)) >> 8
+    blended += 128
+    np.right_shift(blended, 8, out=shifted)
+    blended += shifted
+    blended >>= 8
+    np.copyto(out, blended, casting="unsafe")
+    return out
+
+def alpha_blend(foreground, background, alpha, out=None):
+    """
+        Blend the foreground over the background.
+        alpha is an uint8 mask with the shape (height, width, 1)
+        The result is written to out, which may be the foreground.
+    """
+    if out is None:
+        out = np.empty(foreground.shape, dtype=np.uint8)
+
+    if njit is not None:
+        _alpha_blend_numba(foreground, background, alpha, out)
+        return out
+
+    inverse_alpha = _work_buffer(alpha.shape, np.uint8)
+    premultiplied = _work_buffer(foreground.shape, np.uint16, 2)
+    np.subtract(255, alpha, out=inverse_alpha)
+    np.multiply(foreground, alpha, out=premultiplied, dtype=np.uint16)
+    return composite(premultiplied, background, inverse_alpha, out)
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _composite_numba(premultiplied, background, inverse_alpha, out):
+        height, width, channels = out.shape
+        for y in prange(height):
+            for x in range(width):
+                inverse = np.int64(inverse_alpha[y, x, 0])
+                for c in range(channels):
+                    value = np.int64(premultiplied[y, x, c]) + \
+                        np.int64(background[y, x, c]) * inverse + 128
+                    out[y, x, c] = (value + (value >> 8)) >> 8
+
+    @njit(parallel=True, cache=True)
+    def _alpha_blend_numba(foreground, background, alpha, out):
+        height, width, channels = out.shape
+        for y in prange(height):
+            for x in range(width):
+                opacity = np.int64(alpha[y, x, 0])
+                for c in range(channels):
+                    value = np.int64(foreground[y, x, c]) * opacity + \
+                        np.int64(background[y, x, c]) * (255 - opacity) + 128
+                    out[y, x, c] = (value + (value >> 8)) >> 8
@@ -1,5 +1,6 @@
 import tensorflow as tf
 import numpy as np
+import cv2
 
 def remove_padding_and_resize_back(resized_and_padded, original_height, original_width,
         padT, padB, padL, padR):
@@ -24,6 +25,25 @@ def scale_and_crop_to_input_tensor_shape(tensor,
     return remove_padding_and_resize_back(in_resized_and_padded,
         input_tensor_height, input_tensor_width, padT, padB, padL, padR)
 
+def scale_and_crop_to_mask(segment_logits,
+        input_height, input_width,
+        padT, padB, padL, padR,
+        threshold):
+    """
+        Scale the segment logits to the padded input size with OpenCV,
+        remove the padding and threshold the segment scores.
+        Comparing the logits with the logit of the threshold gives the same
+        result as comparing the sigmoid of the logits with the threshold.
+    """
+    logits = np.squeeze(segment_logits).astype(np.float32, copy=False)
+    logits = cv2.resize(logits,
+        (input_width + padL + padR, input_height + padT + padB),
+        interpolation=cv2.INTER_LINEAR)
+    logits = logits[padT:padT + input_height, padL:padL + input_width]
+    with np.errstate(divide="ignore"):
+        logit_threshold = np.log(threshold) - np.log1p(-threshold)
+    return (logits > logit_threshold).astype(np.uint8)
+
 def is_valid_input_resolution(resolution, output_stride):
     return (resolution - 1) % output_stride == 0;
 
@@ -39,8 +59,7 @@ def to_input_resolution_height_and_width(internal_resolution, output_stride, inp
 def to_mask_tensor(segment_scores, threshold):
     return tf.math.greater(segment_scores, tf.constant(threshold))
 
-def calc_padding(input_tensor, targetH, targetW):
-    height, width = input_tensor.shape[:2]
+def calc_padding(height, width, targetH, targetW):
     target_aspect = targetW / targetH;
     aspect = width / height;
     padT, padB, padL, padR = 0, 0, 0, 0;
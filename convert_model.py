@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+    Convert the bodypix model downloaded by get-model.sh into a TFLite
+    model, that can be used by setting tflite_model in the config.
+
+    The input resolution of the model depends on the resolution of the
+    webcam, so the width and height of the webcam image must be given.
+
+    With --quantize the model is quantized to int8 with an uint8 input,
+    using the images in the given folder (e.g. photos taken with the
+    webcam) to calibrate the quantization.
+"""
+
+import argparse
+import glob
+import cv2
+import numpy as np
+import tensorflow as tf
+import tfjs_graph_converter as tfjs
+
+from bodypix_functions import to_input_resolution_height_and_width
+
+# Must match the model settings in virtual_webcam.py
+output_stride = 16
+multiplier = 0.5
+
+model_path = 'bodypix_mobilenet_float_{0:03d}_model-stride{1}'.format(
+    int(100 * multiplier), output_stride)
+
+parser = argparse.ArgumentParser(
+    description="Convert the bodypix model to a TFLite model")
+parser.add_argument("width", type=int, help="Width of the webcam image")
+parser.add_argument("height", type=int, help="Height of the webcam image")
+parser.add_argument("-o", "--output", default=model_path + ".tflite",
+    help="Filename of the TFLite model")
+parser.add_argument("--internal-resolution", type=float, default=0.25,
+    help="internal_resolution set in the config (default: 0.25)")
+parser.add_argument("--quantize", metavar="IMAGE_FOLDER",
+    help="Quantize the model using the images in IMAGE_FOLDER")
+args = parser.parse_args()
+
+target_height, target_width = to_input_resolution_height_and_width(
+    args.internal_resolution, output_stride, args.height, args.width)
+
+print("Loading model...")
+graph = tfjs.api.load_graph_model(model_path)
+print("done.")
+
+input_tensor_names = tfjs.util.get_input_tensors(graph)
+output_tensor_names = tfjs.util.get_output_tensors(graph)
+input_tensor = graph.get_tensor_by_name(input_tensor_names[0])
+input_tensor.set_shape([1, target_height, target_width, 3])
+# Only the segments are used by virtual_webcam.py
+segments_tensor = graph.get_tensor_by_name(output_tensor_names[1])
+
+print("Converting model for an input of {0}x{1}...".format(
+    target_width, target_height))
+with tf.compat.v1.Session(graph=graph) as sess:
+    converter = tf.compat.v1.lite.TFLiteConverter.from_session(sess,
+        [input_tensor], [segments_tensor])
+    if args.quantize:
+        # Skip files that are not images (imread returns None)
+        images = [cv2.imread(filename)
+            for filename in glob.glob(args.quantize + "/*.*")]
+        images = [image for image in images if image is not None]
+        if not images:
+            parser.error("No images found in {0}".format(args.quantize))
+
+        def representative_dataset():
+            for image in images:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                image = tf.image.resize_with_pad(image,
+                    target_height, target_width,
+                    method=tf.image.ResizeMethod.BILINEAR)
+                # Preprocessing for mobilenet
+                image = np.divide(image, 127.5)
+                image = np.subtract(image, 1.0)
+                yield [image[np.newaxis, ...].astype(np.float32)]
+
+        print("Quantizing using {0} images".format(len(images)))
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+    tflite_model = converter.convert()
+
+with open(args.output, "wb") as modelfile:
+    modelfile.write(tflite_model)
+print("Saved {0}".format(args.output))
@@ -0,0 +1,32 @@
+import threading
+
+class LatestSlot:
+    """
+        Single-slot handoff between two threads. A new value replaces
+        an older value that was not taken yet, so the consumer always
+        gets the newest value instead of working through a backlog.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._value = None
+        self._has_value = False
+
+    def put(self, value):
+        """
+            Publish a value, replacing the previous one
+        """
+        with self._condition:
+            self._value = value
+            self._has_value = True
+            self._condition.notify()
+
+    def get(self):
+        """
+            Wait for a new value and return it
+        """
+        with self._condition:
+            while not self._has_value:
+                self._condition.wait()
+            self._has_value = False
+            return self._value
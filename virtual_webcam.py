@@ -10,18 +10,22 @@ import stat
 import glob
 import yaml
 import time
-from pyfakewebcam import FakeWebcam
+import threading
+from functools import lru_cache, partial
 
 from bodypix_functions import calc_padding
-from bodypix_functions import scale_and_crop_to_input_tensor_shape
+from bodypix_functions import scale_and_crop_to_mask
 from bodypix_functions import to_input_resolution_height_and_width
-from bodypix_functions import to_mask_tensor
+from blending import alpha_blend, composite, premultiply
+from pipeline import LatestSlot
+from yuv420_webcam import YUV420FakeWebcam
 import filters
 
 # Default config values
 config = {
     "width": None,
     "height": None,
+    "dilate": 0,
     "erode": 0,
     "blur": 0,
     "segmentation_threshold": 0.75,
@@ -29,27 +33,46 @@ config = {
     "background_image": "background.jpg",
     "virtual_video_device": "/dev/video2",
     "real_video_device": "/dev/video0",
-    "average_masks": 3
+    "average_masks": 3,
+    "internal_resolution": 0.25
 }
 
+# Minimal time in seconds between two checks for changed files
+FILE_CHECK_INTERVAL = 0.5
+
+# Config keys of the filter lists, which are compiled to functions
+# stored with a leading underscore, e.g. "_background_filters"
+FILTER_KEYS = ["background_filters", "foreground_filters",
+    "result_filters", "overlay_filters"]
+
 def load_config(oldconfig):
     """
         Load the config file. This only reads the file,
-        when its mtime is changed.
+        when its mtime is changed and the mtime is checked
+        at most every FILE_CHECK_INTERVAL seconds.
+        The filter lists are compiled once after loading the file.
     """
 
     config = oldconfig
+    now = time.time()
+    if now - config.get("last_config_check", 0) < FILE_CHECK_INTERVAL:
+        return config
+    config["last_config_check"] = now
+
     try:
-        if os.stat("config.yaml").st_mtime != config.get("mtime"):
-            config["mtime"] = os.stat("config.yaml").st_mtime
+        config_mtime = os.stat("config.yaml").st_mtime
+        if config_mtime != config.get("mtime"):
+            config["mtime"] = config_mtime
             with open("config.yaml", "r") as configfile:
                 yconfig = yaml.load(configfile, Loader=yaml.SafeLoader)
                 for key in yconfig:
                     config[key] = yconfig[key]
             # Force image reload
             for key in config:
-                if key.endswith("_mtime"):
+                if key.endswith("_mtime") or key.endswith("_last_check"):
                     config[key] = 0
+            for key in FILTER_KEYS:
+                config["_" + key] = get_imagefilters(config.get(key, []))
     except OSError:
         pass
     return config
@@ -64,8 +87,14 @@ def load_images(images, image_name, height, width, imageset_name,
         imageset_name is an unique name that is used in the config to store
         values like the mtime
         The function only reloads the image(s) when the mtime of the file
-        or folder is changed.
+        or folder is changed and the mtime is checked at most every
+        FILE_CHECK_INTERVAL seconds.
     """
+    now = time.time()
+    if now - config.get(imageset_name + "_last_check", 0) < FILE_CHECK_INTERVAL:
+        return images
+    config[imageset_name + "_last_check"] = now
+
     try:
         replacement_stat = os.stat(image_name)
         if replacement_stat.st_mtime != config.get(imageset_name + "_mtime"):
@@ -86,18 +115,29 @@ def load_images(images, image_name, height, width, imageset_name,
                 image = cv2.resize(image_raw, (width, height),
                     interpolation=interpolation_method)
                 # BGR to RGB
-                image[:,:,0], image[:,:,2] = image[:,:,2], image[:,:,0].copy()
+                if image.shape[2] == 4:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+                else:
+                    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
                 images.append(image)
 
-            config[imageset_name + "_mtime"] = os.stat(image_name).st_mtime
+            config[imageset_name + "_mtime"] = replacement_stat.st_mtime
 
             for i in range(len(images)):
+                alpha = None
+                if images[i].shape[2] == 4:
+                    # The filters only work on the colors, so the alpha
+                    # channel is kept and attached again after filtering
+                    alpha = images[i][:,:,3:]
+                    images[i] = np.ascontiguousarray(images[i][:,:,:3])
                 for image_filter in image_filters:
                     try:
                         images[i] = image_filter(images[i])
                     except TypeError:
                         # caused by a wrong number of arguments in the config
                         pass
+                if alpha is not None:
+                    images[i] = np.concatenate((images[i], alpha), axis=2)
             print("Finished loading background")
 
         return images
@@ -105,6 +145,32 @@ def load_images(images, image_name, height, width, imageset_name,
     except OSError:
         return None
 
+def prepare_overlays(overlays):
+    """
+        Precompute the premultiplied colors and the inverse alpha channel
+        of the overlay(s), so they are not recomputed for every frame.
+        Returns a list of (premultiplied_rgb, inverse_alpha) tuples
+        that can be passed to blending.composite.
+    """
+    if not overlays:
+        return None
+
+    overlay_blends = []
+    for overlay in overlays:
+        if overlay.shape[2] != 4:
+            print("The overlay image has no alpha channel, ignoring it.")
+            return None
+        alpha = overlay[:,:,3:4]
+        overlay_blends.append((premultiply(overlay[:,:,:3], alpha),
+            255 - alpha))
+    return overlay_blends
+
+def apply_filter(image_filter, args, kwargs, frame):
+    """
+        Call the filter with the frame followed by the configured arguments
+    """
+    return image_filter(frame, *args, **kwargs)
+
 def get_imagefilters(filter_list):
     image_filters = []
     for filters_item in filter_list:
@@ -126,24 +192,73 @@ def get_imagefilters(filter_list):
                 # ["filtername", "value1", "value2"]
                 args = params
 
-            _image_filter = filters.get_filter(filter_name)
-            image_filters.append(
-                lambda frame: _image_filter(frame, *args, **kwargs)
-            )
+            # partial binds the filter and its arguments of this loop
+            # iteration; a lambda would look them up when it is called
+            # and use the values of the last iteration
+            image_filters.append(partial(apply_filter,
+                filters.get_filter(filter_name), args, kwargs))
     return image_filters
 
+@lru_cache()
+def get_average_lut(count):
+    """
+        Get the (cached) lookup table, that maps the sum of count 0/1 masks
+        to their average scaled to 0-255
+    """
+    return np.round(np.arange(count + 1) * (255.0 / count)).astype(np.uint8)
+
+def average_mask(mask, num_average_masks):
+    """
+        Add the (0/1) mask to the ring buffer of the last masks and return
+        the average over the buffered masks as uint8 (0-255) mask.
+        The running sum is updated with the new and the evicted mask,
+        so the cost does not depend on the number of averaged masks.
+        The ring buffer is rebuilt when num_average_masks is changed.
+    """
+    global mask_ring, mask_sum, mask_average, mask_ring_idx, mask_ring_count
+    if mask_ring is None or mask_ring.shape[0] != num_average_masks:
+        mask_ring = np.zeros((num_average_masks,) + mask.shape[:2],
+            dtype=np.uint8)
+        mask_sum = np.zeros(mask.shape[:2], dtype=np.uint16)
+        mask_average = np.empty(mask.shape[:2], dtype=np.uint8)
+        mask_ring_idx = 0
+        mask_ring_count = 0
+
+    mask_sum -= mask_ring[mask_ring_idx]
+    mask_ring[mask_ring_idx] = mask
+    mask_sum += mask_ring[mask_ring_idx]
+    mask_ring_idx = (mask_ring_idx + 1) % num_average_masks
+    mask_ring_count = min(mask_ring_count + 1, num_average_masks)
+
+    # Map the sum to the average scaled to 0-255 with a lookup table
+    return np.take(get_average_lut(mask_ring_count), mask_sum,
+        out=mask_average, mode="clip")
+
+@lru_cache()
+def get_kernel(size):
+    """
+        Get the (cached) rectangular structuring element for dilate/erode
+    """
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (size, size))
+
 ### Global variables ###
 
 # Background frames and the current index in the list
 # when the background is a animation
 replacement_bgs = None
 
-# Overlays
+# Overlays and their precomputed blending values
 overlays = None
+overlay_blends = None
 
-# The last mask frames are kept to average the actual mask
-# to reduce flickering
-masks = []
+# The last mask frames are kept in a ring buffer to average the actual
+# mask to reduce flickering. mask_sum is the running sum over the ring,
+# mask_average the buffer for the averaged mask.
+mask_ring = None
+mask_sum = None
+mask_average = None
+mask_ring_idx = 0
+mask_ring_count = 0
 
 # Load the config
 config = load_config(config)
@@ -167,13 +282,16 @@ if config.get("width"):
 if config.get("height"):
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.get("height"))
 # cap.set(cv2.CAP_PROP_FPS, 30)
+# Do not queue up old frames in the driver (not supported by all drivers)
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
 # Get the actual resolution (either webcam default or the configured one)
 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
 # Initialize a fake video device with the same resolution as the real device
-fakewebcam = FakeWebcam(config.get("virtual_video_device"), width, height)
+fakewebcam = YUV420FakeWebcam(config.get("virtual_video_device"),
+    width, height)
 
 # Choose the bodypix (mobilenet) model
 # Allowed values:
@@ -181,37 +299,196 @@ fakewebcam = FakeWebcam(config.get("virtual_video_device"), width, height)
 # internal_resolution: 0.25, 0.5, 0.75, 1.0
 
 output_stride = 16
-internal_resolution = 0.5
+internal_resolution = config.get("internal_resolution")
 multiplier = 0.5
 
 model_path = 'bodypix_mobilenet_float_{0:03d}_model-stride{1}'.format(
     int(100 * multiplier), output_stride)
 
-# Load the tensorflow model
-print("Loading model...")
-graph = tfjs.api.load_graph_model(model_path)  # downloaded from the link above
-print("done.")
+# The input resolution of the model is fixed by the webcam resolution
+target_height, target_width = to_input_resolution_height_and_width(
+    internal_resolution, output_stride, height, width)
+
+# Size and padding of the webcam image scaled to the model input,
+# computed in the same way as tf.image.resize_with_pad does
+resize_ratio = max(width / target_width, height / target_height)
+resized_width = int(width / resize_ratio)
+resized_height = int(height / resize_ratio)
+resize_padT = int((target_height - height / resize_ratio) / 2)
+resize_padL = int((target_width - width / resize_ratio) / 2)
+resize_padB = target_height - resized_height - resize_padT
+resize_padR = target_width - resized_width - resize_padL
+
+# Padding of the model input in the scale of the webcam image, used to
+# crop the segmentation back to the webcam image
+padT, padB, padL, padR = calc_padding(height, width,
+    target_height, target_width)
+
+def load_model():
+    """
+        Load the model and set run_model, input_lut and the sample_image
+        input buffer. This is called by the inference thread, because the
+        TFLite GPU delegate must run on the thread where it was created.
+    """
+    global run_model, input_lut, sample_image
+    input_lut = None
+    if config.get("tflite_model"):
+        # Load a TFLite model created by convert_model.py, optionally
+        # running it on the GPU using a delegate library
+        print("Loading TFLite model...")
+        delegates = []
+        if config.get("tflite_delegate"):
+            delegates.append(
+                tf.lite.experimental.load_delegate(config.get("tflite_delegate")))
+        interpreter = tf.lite.Interpreter(model_path=config.get("tflite_model"),
+            experimental_delegates=delegates)
+        input_details = interpreter.get_input_details()[0]
+        input_index = input_details["index"]
+        output_index = interpreter.get_output_details()[0]["index"]
+        if input_details["dtype"] == np.uint8:
+            # The model is quantized (convert_model.py --quantize), so the
+            # mobilenet preprocessing and the input quantization are folded
+            # into a lookup table for the uint8 pixel values
+            input_scale, input_zero_point = input_details["quantization"]
+            input_lut = np.clip(np.round(
+                (np.arange(256) / 127.5 - 1.0) / input_scale + input_zero_point),
+                0, 255).astype(np.uint8)
+        interpreter.resize_tensor_input(input_index,
+            [1, target_height, target_width, 3])
+        interpreter.allocate_tensors()
+        print("done.")
+
+        def run_model(sample_image):
+            """
+                Run the model and return the segment logits
+            """
+            interpreter.set_tensor(input_index, sample_image)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index)
+    else:
+        # Load the tensorflow model
+        print("Loading model...")
+        graph = tfjs.api.load_graph_model(model_path)  # downloaded from the link above
+        print("done.")
+
+        # Setup the tensorflow session
+        sess = tf.compat.v1.Session(graph=graph)
+        input_tensor_names = tfjs.util.get_input_tensors(graph)
+        output_tensor_names = tfjs.util.get_output_tensors(graph)
+        input_tensor = graph.get_tensor_by_name(input_tensor_names[0])
+
+        # Run the model and return the segment logits. The callable binds the
+        # input and the fetched output once, and only the segments are
+        # fetched, so the other output heads of the model are not computed.
+        run_model = sess.make_callable(output_tensor_names[1],
+            feed_list=[input_tensor])
+
+    # Input buffer of the model, which is reused for every frame
+    if input_lut is not None:
+        sample_image = np.empty((1, target_height, target_width, 3), dtype=np.uint8)
+    else:
+        sample_image = np.empty((1, target_height, target_width, 3), dtype=np.float32)
+
+# The newest webcam image, updated by the capture thread
+captured_frames = LatestSlot()
+
+def capture_frames():
+    """
+        Read the webcam images in a background thread and keep only the
+        newest one, so the main loop never processes images that queued
+        up while the previous frame was processed.
+        None is published when reading from the webcam failed, the
+        exception when the thread fails with an error.
+    """
+    try:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                captured_frames.put(None)
+                return
+            captured_frames.put(frame)
+    except Exception as error:
+        captured_frames.put(error)
+
+# The newest webcam image with its mask, updated by the inference thread
+segmented_frames = LatestSlot()
+
+# Set by the main loop when the mask is used for the output
+mask_needed = True
+
+def get_mask(frame):
+    """
+        Run the bodypix model on the (RGB) frame and return the
+        segmentation mask (0 = background, 1 = person)
+    """
+    input_height, input_width = frame.shape[:2]
+
+    resized_frame = cv2.resize(frame, (resized_width, resized_height),
+        interpolation=cv2.INTER_LINEAR)
+    resized_frame = cv2.copyMakeBorder(resized_frame,
+        resize_padT, resize_padB, resize_padL, resize_padR,
+        cv2.BORDER_CONSTANT, value=0)
+
+    # Preprocessing for resnet
+    #m = np.array([-123.15, -115.90, -103.06])
+    #resized_frame = np.add(resized_frame, m)
+
+    if input_lut is not None:
+        # Quantized model
+        np.take(input_lut, resized_frame, out=sample_image[0], mode="clip")
+    else:
+        # Preprocessing for mobilenet
+        np.multiply(resized_frame, np.float32(1.0 / 127.5), out=sample_image[0])
+        np.subtract(sample_image[0], np.float32(1.0), out=sample_image[0])
+
+    segment_logits = run_model(sample_image)
+    return scale_and_crop_to_mask(segment_logits,
+        input_height, input_width, padT, padB, padL, padR,
+        config["segmentation_threshold"])
 
-# Setup the tensorflow session
-sess = tf.compat.v1.Session(graph=graph)
-input_tensor_names = tfjs.util.get_input_tensors(graph)
-output_tensor_names = tfjs.util.get_output_tensors(graph)
-input_tensor = graph.get_tensor_by_name(input_tensor_names[0])
+def segment_frames():
+    """
+        Run the model on the newest webcam image in a background thread,
+        so the inference of the next frame overlaps with the blending and
+        output of the current frame in the main loop.
+        The mask is None when it was not needed, None is published
+        when reading from the webcam failed. Exceptions of this or the
+        capture thread are published to be raised by the main loop.
+    """
+    try:
+        load_model()
+        while True:
+            frame = captured_frames.get()
+            if frame is None or isinstance(frame, Exception):
+                segmented_frames.put(frame)
+                return
+
+            if config.get("flip_horizontal"):
+                frame = cv2.flip(frame, 1)
+            if config.get("flip_vertical"):
+                frame = cv2.flip(frame, 0)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+            mask = None
+            if mask_needed:
+                mask = get_mask(frame)
+            segmented_frames.put((frame, mask))
+    except Exception as error:
+        segmented_frames.put(error)
 
 def mainloop():
-    global config, masks, replacement_bgs, overlays
+    global config, replacement_bgs, overlays, overlay_blends, mask_needed
     config = load_config(config)
-    success, frame = cap.read()
-    if not success:
+    segmented_frame = segmented_frames.get()
+    if segmented_frame is None:
         print("Error getting a webcam image!")
         sys.exit(1)
+    if isinstance(segmented_frame, Exception):
+        # A worker thread failed
+        raise segmented_frame
+    frame, mask = segmented_frame
 
-    if config.get("flip_horizontal"):
-        frame = cv2.flip(frame, 1)
-    if config.get("flip_vertical"):
-        frame = cv2.flip(frame, 0)
-
-    image_filters = get_imagefilters(config.get("background_filters", []))
+    image_filters = config.get("_background_filters", [])
 
     image_name = config.get("background_image", "background.jpg")
     replacement_bgs = load_images(replacement_bgs, image_name,
@@ -219,12 +496,20 @@ def mainloop():
         config.get("background_interpolation_method"),
         image_filters)
 
-    frame = frame[...,::-1]
-    if replacement_bgs is None:
-        if len(image_filters) == 0:
-            fakewebcam.schedule_frame(frame)
-            return
-
+    # Without a background replacement the model does not need to run
+    mask_needed = replacement_bgs is not None or len(image_filters) > 0 \
+        or config.get("debug_show_mask", False)
+    if not mask_needed or mask is None:
+        # The mask is not used or was skipped for this frame,
+        # because it was not needed for the previous one
+        fakewebcam.schedule_frame(frame)
+        return
+
+    # The filtered frame is the background when no image is configured.
+    # It is not stored in replacement_bgs, which load_images returns
+    # unchanged until the image file is checked again.
+    backgrounds = replacement_bgs
+    if backgrounds is None and len(image_filters) > 0:
         replacement_bg = np.copy(frame)
         for image_filter in image_filters:
             try:
@@ -233,62 +518,28 @@ def mainloop():
                 # caused by a wrong number of arguments in the config
                 pass
 
-        replacement_bgs = [replacement_bg]
-
-    input_height, input_width = frame.shape[:2]
-
-    target_height, target_width = to_input_resolution_height_and_width(
-        internal_resolution, output_stride, input_height, input_width)
-
-    padT, padB, padL, padR = calc_padding(frame, target_height, target_width)
-    resized_frame = tf.image.resize_with_pad(frame, target_height, target_width,
-            method=tf.image.ResizeMethod.BILINEAR)
-
-    resized_height, resized_width = resized_frame.shape[:2]
-
-    # Preprocessing for resnet
-    #m = np.array([-123.15, -115.90, -103.06])
-    #resized_frame = np.add(resized_frame, m)
-
-    # Preprocessing for mobilenet
-    resized_frame = np.divide(resized_frame, 127.5)
-    resized_frame = np.subtract(resized_frame, 1.0)
-    sample_image = resized_frame[tf.newaxis, ...]
-
-    results = sess.run(output_tensor_names,
-        feed_dict={input_tensor: sample_image})
-    segments = np.squeeze(results[1], 0)
-
-    segment_logits = results[1]
-    scaled_segment_scores = scale_and_crop_to_input_tensor_shape(
-        segment_logits, input_height, input_width,
-        padT, padB, padL, padR, True
-    )
-
-    mask = to_mask_tensor(scaled_segment_scores,
-        config["segmentation_threshold"])
-    mask = tf.dtypes.cast(mask, tf.int32)
-    mask = np.reshape(mask, mask.shape[:2])
+        backgrounds = [replacement_bg]
 
     # Average over the last N masks to reduce flickering
     # (at the cost of seeing afterimages)
-    masks.insert(0, mask)
     num_average_masks = max(1, config.get("average_masks", 3))
-    masks = masks[:num_average_masks]
-    mask = np.mean(masks, axis=0)
-
-    mask *= 255
-    if config["dilate"]:
-        mask = cv2.dilate(mask, np.ones((config["dilate"], config["dilate"]), np.uint8), iterations=1)
-    if config["erode"]:
-        mask = cv2.erode(mask, np.ones((config["erode"], config["erode"]), np.uint8), iterations=1)
-    if config["blur"]:
-        mask = cv2.blur(mask, (config["blur"], config["blur"]))
-    mask /= 255.
-    mask_inv = 1.0 - mask
+    mask = average_mask(mask, num_average_masks)
+
+    # Kernel sizes <= 1 do not change the mask
+    # The mask buffer is modified in-place
+    if config["dilate"] > 1:
+        cv2.dilate(mask, get_kernel(config["dilate"]), dst=mask,
+            iterations=1, borderType=cv2.BORDER_REPLICATE)
+    if config["erode"] > 1:
+        cv2.erode(mask, get_kernel(config["erode"]), dst=mask,
+            iterations=1, borderType=cv2.BORDER_REPLICATE)
+    if config["blur"] > 1:
+        cv2.blur(mask, (config["blur"], config["blur"]), dst=mask,
+            borderType=cv2.BORDER_REPLICATE)
+    mask = mask[:,:,np.newaxis]
 
     # Filter the foreground
-    image_filters = get_imagefilters(config.get("foreground_filters", []))
+    image_filters = config.get("_foreground_filters", [])
     for image_filter in image_filters:
         try:
             frame = image_filter(frame)
@@ -296,17 +547,18 @@ def mainloop():
             # caused by a wrong number of arguments in the config
             pass
 
-    replacement_bgs_idx = config.get("replacement_bgs_idx", 0)
-    for c in range(3):
-        frame[:,:,c] = frame[:,:,c] * mask + \
-            replacement_bgs[replacement_bgs_idx][:,:,c] * mask_inv
+    # Only the mask is shown when there is no background replacement
+    if backgrounds is not None:
+        replacement_bgs_idx = config.get("replacement_bgs_idx", 0) % len(backgrounds)
+        replacement_bg = backgrounds[replacement_bgs_idx][:,:,:3]
+        alpha_blend(frame, replacement_bg, mask, out=frame)
 
-    if time.time() - config.get("last_frame_bg", 0) > 1.0 / config.get("background_fps", 1):
-        config["replacement_bgs_idx"] = (replacement_bgs_idx + 1) % len(replacement_bgs)
-        config["last_frame_bg"] = time.time()
+        if time.time() - config.get("last_frame_bg", 0) > 1.0 / config.get("background_fps", 1):
+            config["replacement_bgs_idx"] = (replacement_bgs_idx + 1) % len(backgrounds)
+            config["last_frame_bg"] = time.time()
 
     # Filter the result
-    image_filters = get_imagefilters(config.get("result_filters", []))
+    image_filters = config.get("_result_filters", [])
     for image_filter in image_filters:
         try:
             frame = image_filter(frame)
@@ -315,28 +567,32 @@ def mainloop():
             pass
 
     overlays_idx = config.get("overlays_idx", 0)
-    overlays = load_images(overlays, config.get("overlay_image", ""), height, width,
-        "overlays", get_imagefilters(config.get("overlay_filters", [])))
-
-    if overlays:
-        overlay = overlays[overlays_idx]
-        assert(overlay.shape[2] == 4) # The image has an alpha channel
-        for c in range(3):
-            frame[:,:,c] = frame[:,:,c] * (1.0 - overlay[:,:,3] / 255.0) + \
-                overlay[:,:,c] * (overlay[:,:,3] / 255.0)
+    loaded_overlays = None
+    if config.get("overlay_image"):
+        loaded_overlays = load_images(overlays, config.get("overlay_image"),
+            height, width, "overlays",
+            image_filters=config.get("_overlay_filters", []))
+    if loaded_overlays is not overlays:
+        overlays = loaded_overlays
+        overlay_blends = prepare_overlays(overlays)
+
+    if overlay_blends:
+        overlay_rgb, overlay_inv_alpha = overlay_blends[overlays_idx]
+        composite(overlay_rgb, frame, overlay_inv_alpha, out=frame)
 
         if time.time() - config.get("last_frame_overlay", 0) > 1.0 / config.get("overlay_fps", 1):
             config["overlays_idx"] = (overlays_idx + 1) % len(overlays)
             config["last_frame_overlay"] = time.time()
 
     if config.get("debug_show_mask", False):
-        frame[:,:,0] = mask * 255
-        frame[:,:,1] = mask * 255
-        frame[:,:,2] = mask * 255
+        frame[:] = mask
 
     fakewebcam.schedule_frame(frame)
     last_frame_time = time.time()
 
+threading.Thread(target=capture_frames, daemon=True).start()
+threading.Thread(target=segment_frames, daemon=True).start()
+
 while True:
     try:
         mainloop()
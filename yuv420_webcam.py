@@ -0,0 +1,45 @@
+import cv2
+import fcntl
+import os
+import pyfakewebcam.v4l2 as v4l2
+
+class YUV420FakeWebcam:
+    """
+        Write RGB frames to a v4l2loopback device in the YUV420 (I420)
+        pixel format. Compared to the YUYV format used by pyfakewebcam
+        the frames are smaller (1.5 instead of 2 bytes per pixel) and
+        the conversion is done in a single cv2.cvtColor call.
+    """
+
+    def __init__(self, video_device, width, height):
+        if width % 2 or height % 2:
+            raise ValueError("YUV420 needs an even width and height, "
+                "got {0}x{1}".format(width, height))
+
+        self._width = width
+        self._height = height
+        self._video_device = os.open(video_device, os.O_WRONLY | os.O_SYNC)
+
+        settings = v4l2.v4l2_format()
+        settings.type = v4l2.V4L2_BUF_TYPE_VIDEO_OUTPUT
+        settings.fmt.pix.pixelformat = v4l2.V4L2_PIX_FMT_YUV420
+        settings.fmt.pix.width = width
+        settings.fmt.pix.height = height
+        settings.fmt.pix.field = v4l2.V4L2_FIELD_NONE
+        settings.fmt.pix.bytesperline = width
+        settings.fmt.pix.sizeimage = width * height * 3 // 2
+        # cv2.COLOR_RGB2YUV_I420 produces limited range BT.601
+        settings.fmt.pix.colorspace = v4l2.V4L2_COLORSPACE_SMPTE170M
+        fcntl.ioctl(self._video_device, v4l2.VIDIOC_S_FMT, settings)
+
+    def schedule_frame(self, frame):
+        """
+            Write a RGB frame to the device
+        """
+        if frame.shape[:2] != (self._height, self._width):
+            raise ValueError("Frame size {0}x{1} does not match the device "
+                "size {2}x{3}".format(frame.shape[1], frame.shape[0],
+                    self._width, self._height))
+
+        yuv = cv2.cvtColor(frame, cv2.COLOR_RGB2YUV_I420)
+        os.write(self._video_device, yuv.data)